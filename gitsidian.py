@@ -3,19 +3,72 @@
 """
 from __future__ import annotations
 import argparse
+import contextlib
+import functools
+import heapq
 import json
+import multiprocessing
 import os
+import re
+import shutil
 import sys
+import tempfile
 import textwrap
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future, wait
 from dataclasses import dataclass, asdict
 from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime as _parsedate
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Iterable, Tuple
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Set, Tuple, IO, Union
 import subprocess
 
 APP_NAME = "gitsidian"
 CONFIG_VERSION = 1
 
+# ---------------------------------------------------------------------------
+# Precompiled patterns and tables (hot paths run these once per commit / per note)
+# ---------------------------------------------------------------------------
+
+_RE_WS = re.compile(r'\s+')
+_RE_SHA = re.compile(r"SHA:\s*`([0-9a-fA-F]{7,40})`")
+_RE_DATE = re.compile(r"Date:\s*(.+)$", re.MULTILINE)
+_RE_TITLE = re.compile(r"^#\s+(.+)$", re.MULTILINE)
+_RE_AUTHOR = re.compile(r"Author:\s*(.+)$", re.MULTILINE)
+_RE_DIFFSTAT_SECTION = re.compile(r"(^##\s*Diff\ stats\s*\n)(```[\s\S]*?```)(\n|$)", re.MULTILINE)
+_RE_DIFF_SECTION = re.compile(r"(^##\s*Diff\s*\n)(```[\s\S]*?```)(\n|$)", re.MULTILINE)
+_RE_DIFFSTAT_PLACEHOLDER = re.compile(r"(## Diff stats\s*\n```\s*\n)\(none\)(\s*\n```)")
+_RE_DIFF_PLACEHOLDER = re.compile(r"(## Diff\s*\n```\s*\n)\(none\)(\s*\n```)")
+_RE_STEM_SHA = re.compile(r'[0-9a-fA-F]{7,40}')
+_RE_PH = re.compile(r'\{\{(\w+)\}\}')
+# per-file blocks of a patch, and the header line git prints for binary files
+_RE_PATCH_FILE = re.compile(r'^(?=diff --)', re.MULTILINE)
+_RE_BINARY_PATCH = re.compile(r'^(?:Binary files .* differ|GIT binary patch)$', re.MULTILINE)
+# plain YAML scalars that stay strings: no leading digit, sign or dot (numbers,
+# .inf/.nan) and none of the YAML 1.1 booleans/null below
+_RE_YAML_SAFE = re.compile(r'[A-Za-z_][A-Za-z0-9_./-]*\Z')
+_YAML_RESERVED = frozenset(("true", "false", "yes", "no", "on", "off", "y", "n", "null"))
+_RE_FRONTMATTER = re.compile(rb'\A---(.*?)\n---', re.DOTALL)
+_RE_FM_KV = re.compile(r'^[ \t]*(sha|date|title|author)[ \t]*:[ \t]*(.*?)[ \t]*$', re.IGNORECASE | re.MULTILINE)
+
+# control chars plus bidi/zero-width marks, deleted from filenames
+_STRIP_TABLE = {c: None for c in list(range(0, 32)) + [0x7F, 0x200B, 0x200C, 0x200D, 0xFEFF]}
+# branch index entries: newlines dropped from file names, blanked in dates and
+# authors (carriage returns dropped there), pipes escaped in wiki-link aliases
+_NAME_NL_TABLE = {ord('\n'): None, ord('\r'): None}
+_DATE_NL_TABLE = str.maketrans({'\n': ' ', '\r': ' '})
+_AUTHOR_NL_TABLE = {ord('\n'): ' ', ord('\r'): None}
+_TITLE_TABLE = str.maketrans({'|': '¦'})
+# path separators and pipes become dashes
+_PATH_TABLE = str.maketrans({'/': '-', '\\': '-', '|': '-'})
+# escapes for YAML double-quoted scalars: quote, backslash and control characters
+_YAML_ESC = str.maketrans({
+    **{chr(c): f"\\x{c:02x}" for c in list(range(0, 32)) + [0x7F]},
+    '"': '\\"', '\\': '\\\\', '\n': '\\n', '\r': '\\r', '\t': '\\t',
+    '\x85': '\\N', '\u2028': '\\L', '\u2029': '\\P',
+})
+
 # ---------------------------------------------------------------------------
 # Platform-specific config dir
 # ---------------------------------------------------------------------------
@@ -44,6 +97,10 @@ class RepoOptions:
     fileNameStyle: str = "sha"  # sha | date-sha | short-sha
     maxInitialCommitsPerBranch: Optional[int] = None
     skipBinaryDiff: bool = True
+    # notes at least this large are assumed to already hold their diff sections
+    minCompleteBytes: Optional[int] = None
+    # newest commits listed in a branch index (None: all)
+    maxBranchIndexEntries: Optional[int] = None
 
 @dataclass
 class RepoConfig:
@@ -62,6 +119,10 @@ class AppConfig:
     version: int
     repos: List[RepoConfig]
 
+def diff_options_key(opts: RepoOptions) -> str:
+    """Signature of the options that decide what a complete note's diff sections hold."""
+    return f"diffstat={int(opts.includeDiffStat)},diff={int(opts.includeDiff)},skipBinary={int(opts.skipBinaryDiff)}"
+
 # ---------------------------------------------------------------------------
 # Config management
 # ---------------------------------------------------------------------------
@@ -131,30 +192,236 @@ def git_available() -> bool:
     except Exception:
         return False
 
-def run_git(repo_path: Path, args: List[str], check: bool = True) -> str:
-    """Run a git command in repo_path and return stdout text."""
+def run_git(repo_path: Path, args: List[str], check: bool = True, text: bool = False) -> Union[bytes, str]:
+    """Run a git command in repo_path and return raw stdout bytes (decoded if text=True).
+
+    Callers that only need part of a large output decode just that part.
+    """
     proc = subprocess.run(["git", "-C", str(repo_path)] + args, check=check, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    return proc.stdout.decode("utf-8", errors="replace")
+    if text:
+        return proc.stdout.decode("utf-8", errors="replace")
+    return proc.stdout
+
+def stream_git(repo_path: Path, args: List[str], sep: bytes = b"\x00",
+               input_lines: Optional[Iterable[str]] = None) -> Iterator[str]:
+    """Run a git command in repo_path and yield its stdout split on sep as it arrives.
+
+    input_lines, if given, are fed to git's stdin from a helper thread while
+    the output is read, so neither pipe can fill up and block git.
+    Raises CalledProcessError once the output is exhausted if git failed.
+    """
+    cmd = ["git", "-C", str(repo_path)] + args
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=1 << 20,
+                            stdin=subprocess.PIPE if input_lines is not None else None)
+    feeder = None
+    if input_lines is not None:
+        feeder = threading.Thread(target=_feed_lines, args=(proc.stdin, input_lines), daemon=True)
+        feeder.start()
+    try:
+        yield from _stream_records(proc.stdout, sep)
+        err = proc.stderr.read()
+        if proc.wait() != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=err)
+    finally:
+        # consumer may stop early: don't leave git blocked on a full pipe
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.stderr.close()
+        proc.wait()
+        if feeder is not None:
+            feeder.join()
+
+def _feed_lines(pipe: IO[bytes], lines: Iterable[str]) -> None:
+    try:
+        for line in lines:
+            pipe.write(line.encode("utf-8") + b"\n")
+    except OSError:
+        pass  # git exited (or was killed) before reading everything
+    finally:
+        try:
+            pipe.close()
+        except OSError:
+            pass
+
+def _stream_records(stream: IO[bytes], sep: bytes = b"\x00", chunk_size: int = 1 << 20) -> Iterator[str]:
+    """Read stream in chunks and yield each complete sep-terminated record decoded."""
+    buf = bytearray()
+    while True:
+        chunk = stream.read1(chunk_size)
+        if not chunk:
+            break
+        # only the new bytes can hold a separator; records are sliced by
+        # offset and the consumed prefix dropped once per chunk, so a chunk
+        # full of short records isn't shifted record by record
+        scan_from = len(buf)
+        buf += chunk
+        start = 0
+        while True:
+            i = buf.find(sep, scan_from)
+            if i == -1:
+                break
+            yield buf[start:i].decode("utf-8", errors="replace")
+            start = scan_from = i + 1
+        del buf[:start]
+    if buf:
+        yield buf.decode("utf-8", errors="replace")
 
 def ensure_git_repo(path: Path) -> bool:
     try:
-        out = run_git(path, ["rev-parse", "--is-inside-work-tree"]).strip()
+        out = run_git(path, ["rev-parse", "--is-inside-work-tree"], text=True).strip()
         return out == "true"
     except subprocess.CalledProcessError:
         return False
 
+# directories atomic_write already created, so bulk writes skip the mkdir stat
+_CREATED_DIRS: set = set()
+
+def write_file(path: Path, content: str) -> None:
+    # encode once and write the bytes directly, no text-mode file object
+    data = memoryview(content.encode("utf-8"))
+    fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        while data:
+            data = data[os.write(fd, data):]
+    finally:
+        os.close(fd)
+
 def atomic_write(path: Path, content: str) -> None:
-    tmp = path.with_suffix(path.suffix + ".tmp")
-    path.parent.mkdir(parents=True, exist_ok=True)
-    tmp.write_text(content, encoding="utf-8")
-    os.replace(tmp, path)
+    # temp name unique per process and thread: repos sharing a vault may write
+    # the same file (e.g. a branch index.md) concurrently
+    tmp = path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    parent = path.parent
+    if parent not in _CREATED_DIRS:
+        parent.mkdir(parents=True, exist_ok=True)
+        _CREATED_DIRS.add(parent)
+    try:
+        write_file(tmp, content)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+# prefix of the folders durable batches are staged in, inside a branch folder;
+# the full name is .staging-<pid>-<random>, one folder per batch
+STAGING_PREFIX = ".staging-"
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill would terminate the process there: assume it's alive
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # exists, but owned by another user
+    return True
 
+def staging_is_stale(path: str) -> bool:
+    """Whether the staging folder at path was left by a process that has exited."""
+    try:
+        pid = int(os.path.basename(path)[len(STAGING_PREFIX):].split("-", 1)[0])
+    except ValueError:
+        return True
+    # this process's own folders belong to batches still being written
+    return pid != os.getpid() and not _pid_alive(pid)
+
+@functools.lru_cache(maxsize=None)
+def _libc_syncfs() -> Optional[Any]:
+    # syncfs(2) is Linux-only and not wrapped by the os module
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        fn = ctypes.CDLL(None, use_errno=True).syncfs
+    except (ImportError, OSError, AttributeError):
+        return None
+    fn.argtypes = [ctypes.c_int]
+    return fn
+
+def flush_filesystem(path: Path) -> bool:
+    """Flush the filesystem holding path with one syncfs call; False where that isn't available."""
+    syncfs = _libc_syncfs()
+    if syncfs is None:
+        return False
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        return syncfs(fd) == 0
+    finally:
+        os.close(fd)
+
+def publish_staged(stage_dir: Path, dest_dir: Path) -> None:
+    """Flush the files in stage_dir, move them into dest_dir, then remove stage_dir.
+
+    The batch is flushed with one syncfs of its filesystem, or an fsync per
+    file where syncfs isn't available; the renames are then flushed with a
+    single fsync of dest_dir.
+    """
+    names = os.listdir(stage_dir)
+    if names and not flush_filesystem(stage_dir):
+        for name in names:
+            fd = os.open(os.path.join(stage_dir, name), os.O_RDWR | getattr(os, "O_BINARY", 0))
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+    for name in names:
+        os.replace(os.path.join(stage_dir, name), os.path.join(dest_dir, name))
+    if hasattr(os, "O_DIRECTORY"):  # directories can't be opened for fsync on Windows
+        dfd = os.open(str(dest_dir), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dfd)
+        finally:
+            os.close(dfd)
+    os.rmdir(stage_dir)
+
+def complete_state_dir(vault: Path, repo_id: str) -> Path:
+    """Folder holding, per branch, the notes of repo_id whose diff sections are complete."""
+    return vault / ".gitsidian" / "state" / repo_id
+
+def load_complete_shas(path: Path, key: str) -> Set[str]:
+    """Return the shas recorded in a branch state file, or none if it was written for other diff options."""
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return set()
+    if not isinstance(raw, dict) or raw.get("key") != key:
+        return set()
+    return set(raw.get("complete", []))
+
+def save_complete_shas(path: Path, key: str, shas: Set[str]) -> None:
+    atomic_write(path, json.dumps({"key": key, "complete": sorted(shas)}, separators=(",", ":")) + "\n")
+
+def prune_complete_state(vault: Path, repo_id: str, branches: Iterable[str]) -> None:
+    """Delete the state files of branches that no longer exist."""
+    state_dir = complete_state_dir(vault, repo_id)
+    keep = {f"{br}.json" for br in branches}
+    for path in state_dir.rglob("*.json"):
+        if path.relative_to(state_dir).as_posix() not in keep:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def _yaml_q(s: str) -> str:
+    """Return s as a double-quoted YAML scalar."""
+    return '"' + s.translate(_YAML_ESC) + '"'
+
+def yaml_scalar(s: str) -> str:
+    """Return s as a plain YAML scalar when it reads back as the same string, else double-quoted."""
+    if _RE_YAML_SAFE.match(s) and s.lower() not in _YAML_RESERVED:
+        return s
+    return _yaml_q(s)
 
 def sanitize_filename(name: str) -> str:
     """Return a filesystem- and Obsidian-safe filename by removing control chars
     and collapsing whitespace. Keeps the extension if present.
     """
-    import re
     if not name:
         return name
     # preserve extension
@@ -164,16 +431,12 @@ def sanitize_filename(name: str) -> str:
         base, ext = parts[0], '.' + parts[1]
     else:
         base = name
-    # remove bidi/zero-width and control characters
-    base = re.sub(r'[\u200B-\u200D\uFEFF]', '', base)
-    base = re.sub(r'[\x00-\x1F\x7F]', '', base)
+    # remove bidi/zero-width and control characters, map path separators/pipes to '-'
+    base = base.translate(_STRIP_TABLE).translate(_PATH_TABLE)
     # replace any remaining whitespace with a single dash
-    base = re.sub(r'\s+', '-', base)
-    # remove any path separators or pipes
-    base = base.replace('/', '-').replace('\\', '-').replace('|', '-')
-    # collapse multiple dashes
-    base = re.sub(r'-{2,}', '-', base)
-    base = base.strip('-')
+    base = '-'.join(base.split())
+    # collapse multiple dashes and strip them from both ends
+    base = '-'.join(part for part in base.split('-') if part)
     return base + ext
 
 # ---------------------------------------------------------------------------
@@ -270,36 +533,150 @@ def choose_option(title: str, options: List[str], default: str) -> str:
 
 def slugify(name: str) -> str:
     out = []
+    prev_dash = False
     for ch in name.lower():
         if ch.isalnum():
             out.append(ch)
-        elif ch in (' ', '_', '-', '.'):  # unify to '-'
-            out.append('-')
-    slug = ''.join(out)
-    while '--' in slug:
-        slug = slug.replace('--', '-')
-    return slug.strip('-') or 'repo'
+            prev_dash = False
+        elif ch in (' ', '_', '-', '.'):  # unify to a single '-'
+            if not prev_dash:
+                out.append('-')
+                prev_dash = True
+    return ''.join(out).strip('-') or 'repo'
 
 # ---------------------------------------------------------------------------
 # Git operations and templating
 # ---------------------------------------------------------------------------
 
 FIELD_SEP = "\x1f"  # unit separator between fields
-REC_SEP = "\x1e"    # record separator between commits
-
-def list_local_branches(repo_path: Path) -> List[str]:
-    out = run_git(repo_path, [
-        "for-each-ref", "--format=%(refname:short)", "refs/heads"
-    ])
-    branches = [line.strip() for line in out.splitlines() if line.strip()]
+# record separator between commits: NUL, the one byte git never prints in a
+# textual patch (content with NUL is treated as binary)
+REC_SEP = "\x00"
+
+def list_local_branches(repo_path: Path) -> List[Tuple[str, str, str]]:
+    """Return (name, head_sha, committer_date) for every local branch in one git call."""
+    lines = stream_git(repo_path, [
+        "for-each-ref", "--format=%(refname:short)%1f%(objectname)%1f%(committerdate:iso8601)", "refs/heads"
+    ], sep=b"\n")
+    branches = []
+    for line in lines:
+        fields = line.strip().split(FIELD_SEP)
+        if len(fields) == 3 and fields[0]:
+            branches.append((fields[0], fields[1], fields[2]))
     return branches
 
+class GitCatFile:
+    """Long-lived `git cat-file --batch-check` process for object lookups.
+
+    Each query is a line written to the process' stdin instead of a new git
+    process. Use as a context manager or call close() when done.
+    """
+
+    def __init__(self, repo_path: Path):
+        self._proc = subprocess.Popen(
+            ["git", "-C", str(repo_path), "cat-file", "--batch-check=%(objectname) %(objecttype)"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self._lock = threading.Lock()
+
+    def lookup(self, sha: str) -> Optional[Tuple[str, str]]:
+        """Return (full object name, object type) for sha, or None if it doesn't resolve."""
+        sha = (sha or "").strip()
+        # one query per line: anything with whitespace would desync the protocol
+        if not sha or len(sha.split()) != 1:
+            return None
+        with self._lock:
+            try:
+                self._proc.stdin.write(sha.encode("utf-8") + b"\n")
+                self._proc.stdin.flush()
+                reply = self._proc.stdout.readline()
+            except (BrokenPipeError, ValueError):
+                return None
+        # found: "<objectname> <type>\n"; otherwise "<input> missing" / "<input> ambiguous"
+        name, _, kind = reply.decode("utf-8", errors="replace").strip().partition(" ")
+        if not name or kind in ("", "missing", "ambiguous"):
+            return None
+        return name, kind
+
+    def exists(self, sha: str) -> bool:
+        """Return True if sha (any object name git understands) resolves to an object."""
+        return self.lookup(sha) is not None
+
+    def close(self) -> None:
+        if self._proc.poll() is None:
+            try:
+                self._proc.stdin.close()
+                self._proc.wait(timeout=5)
+            except Exception:
+                self._proc.kill()
+                self._proc.wait()
+        self._proc.stdout.close()
+
+    def __enter__(self) -> "GitCatFile":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+def drop_binary_patches(patch: str) -> str:
+    """Remove the per-file blocks of binary files from `-p` output.
+
+    git never sends binary content without --binary, only a "Binary files ...
+    differ" line; blocks that have one are dropped so notes hold text diffs only.
+    """
+    if "Binary files " not in patch and "GIT binary patch" not in patch:
+        return patch
+    blocks = _RE_PATCH_FILE.split(patch)
+    return "".join(b for b in blocks if not _RE_BINARY_PATCH.search(b)).strip()
+
+def _split_stat_and_patch(tail: str, include_diffstat: bool, include_diff: bool,
+                          skip_binary: bool = False) -> Tuple[str, str]:
+    """Split the `--stat`/`-p` output that follows a commit header in `git log`.
+
+    With both enabled git emits a `---` line, the diffstat, a blank line and
+    then the patch starting at the first `diff --git` (or `diff --cc`) header.
+    """
+    tail = tail.strip("\n")
+    if include_diffstat and include_diff:
+        if tail.startswith("---\n"):
+            tail = tail[4:]
+        if tail.startswith("diff --"):
+            stat, patch = "", tail.strip()
+        else:
+            idx = tail.find("\ndiff --")
+            if idx == -1:
+                return tail.strip(), ""
+            stat, patch = tail[:idx].strip(), tail[idx:].strip()
+    elif include_diffstat:
+        return tail.strip(), ""
+    elif include_diff:
+        stat, patch = "", tail.strip()
+    else:
+        return "", ""
+    return stat, drop_binary_patches(patch) if skip_binary else patch
+
 def iter_commits(repo_path: Path, branch: str, since_sha: Optional[str], include_merges: bool,
-                 limit: Optional[int]) -> Iterable[Dict[str, Any]]:
-    """Yield commits after since_sha (exclusive) on branch in chronological order."""
-    # Compose pretty format with record separators
-    fmt = "%H%x1f%h%x1f%an%x1f%ae%x1f%ai%x1f%s%x1f%B%x1f%P%x1e"
-    base_args = ["log", branch, f"--pretty=format:{fmt}", "--reverse"]
+                 limit: Optional[int], include_diffstat: bool = False, include_diff: bool = False,
+                 skip_binary: bool = True, cat: Optional[GitCatFile] = None) -> Iterable[Dict[str, Any]]:
+    """Yield commits after since_sha (exclusive) on branch in chronological order.
+
+    Diffstat and diff are produced by the same `git log` invocation when
+    requested, so no extra git process is spawned per commit.
+    """
+    # Compose pretty format with record separators; the trailing field
+    # separator marks where the stat/patch output of each commit begins.
+    fmt = "%x00%H%x1f%h%x1f%an%x1f%ae%x1f%ai%x1f%s%x1f%B%x1f%P%x1f"
+    diff_args = ["--no-color"]
+    if include_diffstat:
+        diff_args.append("--stat")
+    if include_diff:
+        diff_args.append("-p")
+        if skip_binary:
+            diff_args.append("--no-textconv")
+    if include_merges and (include_diffstat or include_diff):
+        # match `git show`: combined diff for merges
+        diff_args.append("--cc")
+    base_args = ["log", branch, f"--pretty=format:{fmt}", "--reverse"] + diff_args
     if not include_merges:
         base_args.append("--no-merges")
     if since_sha:
@@ -307,6 +684,9 @@ def iter_commits(repo_path: Path, branch: str, since_sha: Optional[str], include
         since_sha = since_sha.strip()
         if not since_sha:
             since_sha = None
+        elif cat is not None and not cat.exists(since_sha):
+            # e.g. rebased and garbage-collected: the range would make git log fail
+            since_sha = None
 
     if since_sha:
         # ancestry-path keeps only commits reachable from branch through ancestry
@@ -317,62 +697,81 @@ def iter_commits(repo_path: Path, branch: str, since_sha: Optional[str], include
     if limit:
         base_args.extend(["-n", str(limit)])
 
+    def parse(rec: str) -> Optional[Dict[str, Any]]:
+        fields = rec.split(FIELD_SEP, 8)
+        if len(fields) < 9:
+            return None
+        full, short, an, ae, ai, subject, body, parents, tail = fields
+        parents_list = [p for p in parents.strip().split() if p]
+        diffstat, diff = _split_stat_and_patch(tail, include_diffstat, include_diff, skip_binary)
+        return {
+            "sha": full.strip(),
+            "short": short,
+            "author": an,
+            "email": ae,
+            "date": ai,
+            "subject": subject.strip(),
+            "body": body.rstrip(),
+            "parents": parents_list,
+            "diffstat": diffstat,
+            "diff": diff,
+        }
+
     try:
-        out = run_git(repo_path, base_args)
-        records = [r for r in out.split(REC_SEP) if r.strip()]
-        if not records and since_sha:
+        found = False
+        for rec in stream_git(repo_path, base_args, sep=b"\x00"):
+            commit = parse(rec)
+            if commit:
+                found = True
+                yield commit
+        if not found and since_sha:
             # Fallback: full history if since_sha not in ancestry
-            out = run_git(repo_path, ["log", branch, f"--pretty=format:{fmt}", "--reverse"] + (["--no-merges"] if not include_merges else []))
-            records = [r for r in out.split(REC_SEP) if r.strip()]
-        for rec in records:
-            fields = rec.split(FIELD_SEP)
-            if len(fields) < 8:
-                continue
-            full, short, an, ae, ai, subject, body, parents = fields[0], fields[1], fields[2], fields[3], fields[4], fields[5], fields[6], fields[7]
-            parents_list = [p for p in parents.strip().split() if p]
-            yield {
-                "sha": full,
-                "short": short,
-                "author": an,
-                "email": ae,
-                "date": ai,
-                "subject": subject.strip(),
-                "body": body.rstrip(),
-                "parents": parents_list,
-            }
+            full_args = ["log", branch, f"--pretty=format:{fmt}", "--reverse"] + diff_args + (["--no-merges"] if not include_merges else [])
+            for rec in stream_git(repo_path, full_args, sep=b"\x00"):
+                commit = parse(rec)
+                if commit:
+                    yield commit
     except subprocess.CalledProcessError as e:
         eprint(f"git log failed on branch {branch}: {e}")
 
-def get_diffstat(repo_path: Path, sha: str) -> str:
-    """Return a diffstat for a single commit.
-
-    Primary method uses `git show --stat` for the commit. If that produces no
-    output (edge cases, certain configs), fall back to `git diff --stat sha^!`.
-    """
-    try:
-        out = run_git(repo_path, ["show", "--no-color", "--stat", "--format=", sha])
-        out = out.strip()
-        if out:
-            return out
-    except subprocess.CalledProcessError:
-        pass
-    # Fallback: explicit single-commit diff using sha^!
-    try:
-        out2 = run_git(repo_path, ["diff", "--no-color", "--stat", "--no-ext-diff", f"{sha}^!"])
-        return out2.strip()
-    except subprocess.CalledProcessError:
-        return ""
-
-def get_diff(repo_path: Path, sha: str, skip_binary: bool = True) -> str:
-    try:
-        args = ["show", "--no-color", "--format=", sha]
+def get_diff_and_stat(repo_path: Path, sha: str, include_diff: bool, include_stat: bool,
+                      skip_binary: bool = True) -> Tuple[str, str]:
+    """Return (diffstat, diff) for a single commit from one `git show` call."""
+    if not include_diff and not include_stat:
+        return "", ""
+    args = ["show", "--no-color", "--format="]
+    if include_stat:
+        args.append("--stat")
+    if include_diff:
+        args.append("--patch")
         if skip_binary:
-            args.insert(1, "--no-textconv")
+            args.append("--no-textconv")
+    args.append(sha)
+    try:
         out = run_git(repo_path, args)
-        return out.strip()
     except subprocess.CalledProcessError:
-        return ""
+        return "", ""
+    return _split_stat_and_patch(out.decode("utf-8", errors="replace"), include_stat, include_diff, skip_binary)
 
+def iter_commit_diffs(repo_path: Path, shas: Iterable[str], include_diffstat: bool, include_diff: bool,
+                      skip_binary: bool = True) -> Iterator[Tuple[str, str, str]]:
+    """Yield (sha, diffstat, diff) for the commits in shas from one `git diff-tree --stdin`.
+
+    Same output as get_diff_and_stat (combined diff for merges) without a git
+    process per commit. Raises CalledProcessError at the end if git failed.
+    """
+    args = ["diff-tree", "--stdin", "--root", "--always", "--no-color", "--cc", "--format=%x00%H%x1f"]
+    if include_diffstat:
+        args.append("--stat")
+    if include_diff:
+        args.append("-p")
+        if skip_binary:
+            args.append("--no-textconv")
+    for rec in stream_git(repo_path, args, sep=b"\x00", input_lines=shas):
+        sha, sep, tail = rec.partition(FIELD_SEP)
+        if not sep:
+            continue  # nothing before the first record
+        yield (sha.strip(),) + _split_stat_and_patch(tail, include_diffstat, include_diff, skip_binary)
 
 def update_note_diff_sections(note_path: Path, diffstat: str, diff: str, include_diffstat: bool, include_diff: bool) -> None:
     """Update (or insert) the Diff stats and Diff sections in a commit note.
@@ -386,12 +785,9 @@ def update_note_diff_sections(note_path: Path, diffstat: str, diff: str, include
     except Exception:
         return
 
-    import re
-
-    def replace_section(text: str, heading: str, content: str, keep: bool) -> str:
+    def replace_section(text: str, heading: str, pattern: re.Pattern, content: str, keep: bool) -> str:
         # Look for a heading like '## Diff stats' or '## Diff'
-        pattern = rf"(^##\s*{re.escape(heading)}\s*\n)(```[\s\S]*?```)(\n|$)"
-        m = re.search(pattern, text, flags=re.MULTILINE)
+        m = pattern.search(text)
         if m:
             if not keep:
                 # remove entire matched block
@@ -409,8 +805,8 @@ def update_note_diff_sections(note_path: Path, diffstat: str, diff: str, include
             return text
 
     new_txt = txt
-    new_txt = replace_section(new_txt, "Diff stats", diffstat, include_diffstat)
-    new_txt = replace_section(new_txt, "Diff", diff, include_diff)
+    new_txt = replace_section(new_txt, "Diff stats", _RE_DIFFSTAT_SECTION, diffstat, include_diffstat)
+    new_txt = replace_section(new_txt, "Diff", _RE_DIFF_SECTION, diff, include_diff)
 
     if new_txt != txt:
         try:
@@ -428,11 +824,8 @@ def normalize_diff_sections(text: str, diffstat: str, diff: str, include_diffsta
     around the fenced code blocks) differs from the normalized format, causing
     every sync to see a content difference and rewrite notes unnecessarily.
     """
-    import re
-
-    def repl(existing: str, heading: str, content: str, keep: bool) -> str:
-        pattern = rf"(^##\s*{re.escape(heading)}\s*\n)(```[\s\S]*?```)(\n|$)"
-        m = re.search(pattern, existing, flags=re.MULTILINE)
+    def repl(existing: str, heading: str, pattern: re.Pattern, content: str, keep: bool) -> str:
+        m = pattern.search(existing)
         if m:
             if not keep:
                 return existing[:m.start()] + existing[m.end():]
@@ -453,33 +846,38 @@ def normalize_diff_sections(text: str, diffstat: str, diff: str, include_diffsta
     diff_content = (diff or "").strip() or "(none)"
     keep_stats = bool(include_diffstat)
     keep_diff = bool(include_diff)
-    out = repl(out, "Diff stats", stats_content, keep_stats)
-    out = repl(out, "Diff", diff_content, keep_diff)
+    out = repl(out, "Diff stats", _RE_DIFFSTAT_SECTION, stats_content, keep_stats)
+    out = repl(out, "Diff", _RE_DIFF_SECTION, diff_content, keep_diff)
     return out
 
 
-def ensure_diff_sections(note_path: Path, repo_path: Path, sha: str, include_diffstat: bool, include_diff: bool, skip_binary: bool) -> None:
+def ensure_diff_sections(note_path: Path, repo_path: Path, sha: str, include_diffstat: bool, include_diff: bool, skip_binary: bool,
+                         diffs: Optional[Tuple[str, str]] = None) -> bool:
     """Ensure diff/diffstat sections have real content in an existing note if requested.
 
     Replaces "(none)" placeholders with actual data; appends missing sections.
-    Never removes sections or overwrites real user content.
+    Never removes sections or overwrites real user content. diffs is an already
+    known (diffstat, diff) pair, e.g. from the git log stream; otherwise they are
+    fetched with git show. Returns False if the note could not be read.
     """
     try:
         txt = note_path.read_text(encoding="utf-8")
     except Exception:
-        return
+        return False
     
-    import re
     changed = False
+    if diffs is not None:
+        ds, df = diffs
+    else:
+        ds, df = get_diff_and_stat(repo_path, sha, include_diff, include_diffstat, skip_binary)
     
     # Handle Diff stats section
     if include_diffstat:
-        ds = get_diffstat(repo_path, sha)
         if ds.strip():
             # Check if section exists with (none) placeholder
-            pattern = r"(## Diff stats\s*\n```\s*\n)\(none\)(\s*\n```)"
-            if re.search(pattern, txt):
-                txt = re.sub(pattern, rf"\1{ds}\2", txt)
+            if _RE_DIFFSTAT_PLACEHOLDER.search(txt):
+                # callable replacement: diff text must not be parsed as a template
+                txt = _RE_DIFFSTAT_PLACEHOLDER.sub(lambda m: m.group(1) + ds + m.group(2), txt)
                 changed = True
             # If section doesn't exist at all, append it
             elif "## Diff stats" not in txt:
@@ -490,12 +888,10 @@ def ensure_diff_sections(note_path: Path, repo_path: Path, sha: str, include_dif
     
     # Handle Diff section
     if include_diff:
-        df = get_diff(repo_path, sha, skip_binary=skip_binary)
         if df.strip():
             # Check if section exists with (none) placeholder
-            pattern = r"(## Diff\s*\n```\s*\n)\(none\)(\s*\n```)"
-            if re.search(pattern, txt):
-                txt = re.sub(pattern, rf"\1{df}\2", txt)
+            if _RE_DIFF_PLACEHOLDER.search(txt):
+                txt = _RE_DIFF_PLACEHOLDER.sub(lambda m: m.group(1) + df + m.group(2), txt)
                 changed = True
             # If section doesn't exist at all, append it
             elif "## Diff" not in txt:
@@ -506,84 +902,126 @@ def ensure_diff_sections(note_path: Path, repo_path: Path, sha: str, include_dif
     
     if changed:
         atomic_write(note_path, txt)
+    return True
 
 DEFAULT_COMMIT_TEMPLATE = """---\ntitle: \"{{title}}\"\nsha: \"{{sha}}\"\nshort: \"{{short}}\"\nauthor: \"{{author}}\"\nemail: \"{{email}}\"\ndate: \"{{date}}\"\nbranch: \"{{branch}}\"\nparents: {{parents_json}}\ntags: [\"git\",\"commit\", \"{{repo}}\", \"{{branch}}\"]\n---\n# {{title}}\n\nSHA: `{{sha}}`  \nAuthor: {{author}} <{{email}}>  \nDate: {{date}}\n\n## Parents\n{{parents_list}}\n\n## Message\n{{body}}\n\n## Diff stats\n```\n{{diffstat}}\n```\n\n{{#if diff}}\n## Diff\n```\n{{diff}}\n```\n{{/if}}\n"""
 
 DEFAULT_BRANCH_TEMPLATE = """---\ntitle: \"Branch Index: {{branch}}\"\nbranch: \"{{branch}}\"\nupdated: \"{{updated}}\"\ntags: [\"git\",\"branch\",\"index\"]\n---\n# Branch: {{branch}}\n\nHead: [[{{head_note}}]]\n\n## Commits (latest first)\n{{commit_links}}\n"""
 
+@functools.lru_cache(maxsize=32)
+def _load_template_cached(path: str, mtime_ns: int) -> Optional[str]:
+    # mtime is part of the key so edited templates are re-read; nanoseconds
+    # so edits within the same second on coarse float mtimes aren't missed
+    try:
+        return Path(path).read_text(encoding="utf-8")
+    except Exception:
+        return None
+
 def load_template_from_vault(vault_path: Path, name: str) -> Optional[str]:
     override = vault_path / ".gitsidian" / "templates" / f"{name}.md"
-    if override.exists():
-        try:
-            return override.read_text(encoding="utf-8")
-        except Exception:
-            return None
-    return None
+    try:
+        st = override.stat()
+    except OSError:
+        return None
+    return _load_template_cached(str(override), st.st_mtime_ns)
+
+def resolve_template(vault_path: Path, name: str, default: str) -> str:
+    """Return the vault's override for template name, or default when there is none."""
+    return load_template_from_vault(vault_path, name) or default
+
+def _expand_diff_blocks(text: str, show_diff: bool) -> str:
+    # Support two conditional syntaxes: {{#diff}}...{{/diff}} and {{#if diff}}...{{/if}};
+    # a block ends at the earliest closing tag of either form and an opening tag
+    # without one (malformed) is simply dropped.
+    for open_pat in ("{{#diff}}", "{{#if diff}}"):
+        while True:
+            si = text.find(open_pat)
+            if si == -1:
+                break
+            ends = [(ei, cp) for cp in ("{{/diff}}", "{{/if}}") for ei in (text.find(cp, si),) if ei != -1]
+            if not ends:
+                text = text[:si] + text[si + len(open_pat):]
+                continue
+            ei, close_pat = min(ends)
+            inner = text[si + len(open_pat):ei] if show_diff else ""
+            text = text[:si] + inner + text[ei + len(close_pat):]
+    return text
 
-def render_template(tmpl: str, ctx: Dict[str, str]) -> str:
-    # Support two conditional syntaxes: {{#diff}}...{{/diff}} and {{#if diff}}...{{/if}}
-    def remove_or_keep_section(text: str, name: str) -> str:
-        # Support multiple opening forms and multiple closing forms.
-        open_patterns = [f"{{{{#{name}}}}}", f"{{{{#if {name}}}}}"]
-        close_patterns = [f"{{{{/{name}}}}}", "{{/if}}"]
-        out = text
-        for open_pat in open_patterns:
-            while True:
-                si = out.find(open_pat)
-                if si == -1:
-                    break
-                # find the earliest closing token after si
-                ei = -1
-                chosen_close = None
-                for cp in close_patterns:
-                    pos = out.find(cp, si)
-                    if pos != -1 and (ei == -1 or pos < ei):
-                        ei = pos
-                        chosen_close = cp
-                if ei == -1:
-                    # malformed: remove only the opening tag to avoid infinite loop
-                    out = out[:si] + out[si+len(open_pat):]
-                    continue
-                inner = out[si+len(open_pat):ei]
-                if ctx.get(name):
-                    out = out[:si] + inner + out[ei+len(chosen_close):]
-                else:
-                    out = out[:si] + out[ei+len(chosen_close):]
-        return out
-
-    processed = remove_or_keep_section(tmpl, "diff")
+@functools.lru_cache(maxsize=32)
+def compile_template(tmpl: str, show_diff: bool) -> Tuple[str, ...]:
+    """Pre-parse tmpl once per diff state into tokens for render_template.
+
+    tokens alternate literal text and placeholder names.
+    """
+    return tuple(_RE_PH.split(_expand_diff_blocks(tmpl, show_diff)))
 
+def render_template(tmpl: str, ctx: Dict[str, str]) -> str:
     # Support both raw and YAML-escaped placeholders. ctx may contain raw strings and
-    # we expect corresponding YAML-escaped variants with suffix '_yaml'.
-    for k, v in ctx.items():
-        # raw replacement
-        processed = processed.replace(f"{{{{{k}}}}}", v)
-        # YAML-escaped replacement: key_yaml
-        yaml_key = f"{k}_yaml"
-        if yaml_key in ctx:
-            processed = processed.replace(f"{{{{{yaml_key}}}}}", ctx[yaml_key])
-    return processed
+    # we expect corresponding YAML-escaped variants with suffix '_yaml' as their own
+    # keys. Unknown placeholders are left as-is and substituted values are never
+    # re-expanded. The template itself is parsed once and cached.
+    out: List[str] = []
+    for i, tok in enumerate(compile_template(tmpl, bool(ctx.get("diff")))):
+        if i % 2:
+            out.append(ctx.get(tok, "{{" + tok + "}}"))
+        else:
+            out.append(tok)
+    return "".join(out)
+
+def index_note_stem(index: Dict[str, str], stem: str) -> None:
+    """Register a note stem under the SHA-like hex runs in its name (full and 7-char)."""
+    for m in _RE_STEM_SHA.finditer(stem):
+        run = m.group(0)
+        index.setdefault(run, stem)
+        index.setdefault(run[:7], stem)
+
+def scan_branch_dir(branch_dir: Path, staging: Optional[List[str]] = None) -> Dict[str, Optional[os.DirEntry]]:
+    """Return {filename: DirEntry} for the commit notes in branch_dir (index.md excluded).
+
+    One scandir shared by existence checks, parent resolution and index building
+    during a branch sync. Notes written afterwards are added with a None entry.
+    Staging folder paths found on the way are appended to staging if given.
+    """
+    scan: Dict[str, Optional[os.DirEntry]] = {}
+    try:
+        with os.scandir(branch_dir) as it:
+            for entry in it:
+                # is_file() uses the cached d_type; only symlinks cost a stat
+                if entry.name.endswith(".md") and entry.name != "index.md" and entry.is_file():
+                    scan[entry.name] = entry
+                elif staging is not None and entry.name.startswith(STAGING_PREFIX):
+                    staging.append(entry.path)
+    except OSError:
+        pass
+    return scan
 
-def parents_links(vault: Path, branch: str, parents: List[str], style: str) -> Tuple[str, str]:
+def build_parent_index(branch_dir: Path, scan: Optional[Dict[str, Optional[os.DirEntry]]] = None) -> Dict[str, str]:
+    """Map SHA prefixes found in note filenames of branch_dir to the note stem.
+
+    Lists the directory once (or reuses scan) so parent lookups don't glob it
+    per parent, per commit.
+    """
+    if scan is None:
+        scan = scan_branch_dir(branch_dir)
+    index: Dict[str, str] = {}
+    for name in scan:
+        index_note_stem(index, name[:-3])
+    return index
+
+def parents_links(vault: Path, branch: str, parents: List[str], style: str,
+                  index: Optional[Dict[str, str]] = None) -> Tuple[str, str]:
     """Return a markdown bullet list of parent links using local note names when possible.
 
-    Searches the vault branch folder for files containing the parent SHA (short or full).
-    If a matching note is found, link to its stem (no .md). Otherwise fall back to short SHA.
+    Looks up the parent SHA (full, then short) in the branch's note index, built
+    from the vault branch folder when not supplied. If a matching note is found,
+    link to its stem (no .md). Otherwise fall back to short SHA.
     """
     links = []
-    branch_dir = vault / "branches" / branch
+    if index is None:
+        index = build_parent_index(vault / "branches" / branch)
     for p in parents:
-        link_target = None
         # try exact/full sha in filenames, then short sha
-        try_seeds = [p, p[:7]] if p else []
-        if branch_dir.exists():
-            for seed in try_seeds:
-                for cand in branch_dir.glob(f"*{seed}*.md"):
-                    # pick first candidate
-                    link_target = cand.stem
-                    break
-                if link_target:
-                    break
+        link_target = (index.get(p) or index.get(p[:7])) if p else None
         if not link_target:
             # fallback to short sha
             link_target = p[:7] if p else '(unknown)'
@@ -602,11 +1040,33 @@ def compute_filename(style: str, sha: str, date_iso: str, title: str) -> str:
     # fallback
     return f"{sha}.md"
 
-def write_commit_note(vault: Path, branch: str, commit: Dict[str, Any], opts: RepoOptions, repo_id: Optional[str] = None) -> Path:
+# every casing of the note extension, so checks don't need a lowered copy
+_MD_SUFFIXES = ('.md', '.MD', '.Md', '.mD')
+
+def _strip_md(name: str) -> str:
+    return name[:-3] if name.endswith(_MD_SUFFIXES) else name
+
+def commit_note_path(vault: Path, branch: str, commit: Dict[str, Any], style: str) -> Path:
+    fname = compute_filename(style, commit["sha"], commit.get("date", ""), commit.get("subject", ""))
+    # sanitize generated filename to avoid embedded newlines or control chars
+    fname = sanitize_filename(fname)
+    # ensure extension present
+    if not fname.endswith(_MD_SUFFIXES):
+        fname = fname + '.md'
+    return vault / "branches" / branch / fname
+
+def write_commit_note(vault: Path, branch: str, commit: Dict[str, Any], opts: RepoOptions, repo_id: Optional[str] = None,
+                      parent_index: Optional[Dict[str, str]] = None, stage_dir: Optional[Path] = None) -> Path:
+    note_path = commit_note_path(vault, branch, commit, opts.fileNameStyle)
+    # Never overwrite an existing commit note: preserve any user edits.
+    # Checked before any rendering so re-walking synced commits stays cheap.
+    if note_path.exists():
+        return note_path
+
     # Prepare context
-    parents_markdown, parents_json = parents_links(vault, branch, commit.get("parents", []), opts.fileNameStyle)
+    parents_markdown, parents_json = parents_links(vault, branch, commit.get("parents", []), opts.fileNameStyle, parent_index)
     # Prepare both raw and YAML-escaped context values. YAML-escaped versions
-    # are JSON-encoded strings so they are safe when inserted into YAML frontmatter.
+    # are double-quoted scalars so they are safe when inserted into YAML frontmatter.
     # Normalize and strip key context values to avoid embedded newlines/control chars
     raw_title = (commit.get("subject", "Untitled") or "Untitled").strip()
     sha_val = (commit.get("sha", "") or "").strip()
@@ -620,23 +1080,23 @@ def write_commit_note(vault: Path, branch: str, commit: Dict[str, Any], opts: Re
     repo_branch_tag = f"{repo_id}:{branch}" if repo_id else branch
     ctx = {
         "title": raw_title,
-        "title_yaml": json.dumps(raw_title),
+        "title_yaml": _yaml_q(raw_title),
         "sha": sha_val,
-        "sha_yaml": json.dumps(sha_val),
+        "sha_yaml": _yaml_q(sha_val),
         "short": short_val,
-        "short_yaml": json.dumps(short_val),
+        "short_yaml": _yaml_q(short_val),
         "author": author_val,
-        "author_yaml": json.dumps(author_val),
+        "author_yaml": _yaml_q(author_val),
         "email": email_val,
-        "email_yaml": json.dumps(email_val),
+        "email_yaml": _yaml_q(email_val),
         "date": date_val,
-        "date_yaml": json.dumps(date_val),
+        "date_yaml": _yaml_q(date_val),
         "branch": branch,
-        "branch_yaml": json.dumps(branch),
+        "branch_yaml": _yaml_q(branch),
         "repo": repo_id or "",
-        "repo_yaml": json.dumps(repo_id or ""),
+        "repo_yaml": _yaml_q(repo_id or ""),
         "repo_branch_tag": repo_branch_tag,
-        "repo_branch_tag_yaml": json.dumps(repo_branch_tag),
+        "repo_branch_tag_yaml": _yaml_q(repo_branch_tag),
         "parents_list": parents_markdown,
         "parents_json": parents_json,
         "body": body_val or "(no message)",
@@ -644,7 +1104,7 @@ def write_commit_note(vault: Path, branch: str, commit: Dict[str, Any], opts: Re
         "diff": commit.get("diff", ""),
     }
 
-    tmpl = load_template_from_vault(vault, "commit") or DEFAULT_COMMIT_TEMPLATE
+    tmpl = resolve_template(vault, "commit", DEFAULT_COMMIT_TEMPLATE)
     content = render_template(tmpl, ctx)
 
     # Normalize diff sections so comparison with existing note is stable and
@@ -658,174 +1118,208 @@ def write_commit_note(vault: Path, branch: str, commit: Dict[str, Any], opts: Re
         opts.includeDiff,
     )
 
-    fname = compute_filename(opts.fileNameStyle, commit["sha"], commit.get("date", ""), ctx["title"])
-    # sanitize generated filename to avoid embedded newlines or control chars
-    fname = sanitize_filename(fname)
-    # ensure extension present
-    if not fname.lower().endswith('.md'):
-        fname = fname + '.md'
-    note_path = vault / "branches" / branch / fname
+    if stage_dir is not None:
+        # durable batch: flushed and renamed into place by publish_staged
+        write_file(stage_dir / note_path.name, content)
+    else:
+        atomic_write(note_path, content)
+    if parent_index is not None:
+        index_note_stem(parent_index, note_path.stem)
+    return note_path
 
-    # Never overwrite an existing commit note: preserve any user edits.
-    # If the file exists, skip writing entirely.
-    if note_path.exists():
-        return note_path
+# how much of a note is read before we know whether the body is needed
+_NOTE_HEAD_BYTES = 4096
 
-    atomic_write(note_path, content)
-    return note_path
+def _read_rest(fd: int) -> bytes:
+    chunks = []
+    while True:
+        chunk = os.read(fd, 1 << 16)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+def read_note_meta(note_path: Union[str, Path], need_body: bool = True) -> Tuple[Dict[str, str], str]:
+    """Return (frontmatter values, text read) for a note with a single open.
 
-def write_branch_index(vault: Path, repo_path: Path, branch: str) -> None:
+    Frontmatter sits at the top of the note, so only the first few KB are read
+    unless the block is longer, or (with need_body) a sha/date/title/author
+    value is missing and the body fallbacks need the whole note.
+    """
+    fd = os.open(str(note_path), os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        raw = os.read(fd, _NOTE_HEAD_BYTES)
+        at_eof = len(raw) < _NOTE_HEAD_BYTES
+        vals: Dict[str, str] = {}
+        if raw.startswith(b"---"):
+            m = _RE_FRONTMATTER.match(raw)
+            if m is None and not at_eof:
+                raw += _read_rest(fd)
+                at_eof = True
+                m = _RE_FRONTMATTER.match(raw)
+            # unterminated: scan the whole text
+            fm = m.group(1) if m is not None else raw
+            vals = parse_frontmatter(fm.decode("utf-8", errors="replace"))
+        if need_body and len(vals) < 4 and not at_eof:
+            raw += _read_rest(fd)
+    finally:
+        os.close(fd)
+    return vals, raw.decode("utf-8", errors="replace")
+
+def parse_note_date(date_val: str) -> Optional[datetime]:
+    """Parse a note date: ISO 8601 first (git's %ai output), then RFC 2822."""
+    try:
+        return datetime.fromisoformat(date_val.replace(' ', 'T', 1))
+    except ValueError:
+        pass
+    if len(date_val) == 25 and date_val[19] == ' ':
+        # "2024-01-02 15:04:05 +0000" on Pythons whose fromisoformat rejects it
+        try:
+            return datetime.fromisoformat(f"{date_val[:10]}T{date_val[11:19]}{date_val[20:23]}:{date_val[23:]}")
+        except ValueError:
+            pass
+    try:
+        return _parsedate(date_val)
+    except Exception:
+        return None
+
+def parse_frontmatter(text: str) -> Dict[str, str]:
+    """Return the non-empty sha/date/title/author values found in frontmatter text."""
+    # find lines like: sha: "..." or sha: ...
+    vals: Dict[str, str] = {}
+    for m in _RE_FM_KV.finditer(text):
+        v = m.group(2).strip(' "\'')
+        if not v:
+            # empty value: leave the key to the body fallbacks
+            continue
+        vals[m.group(1).lower()] = v
+        if len(vals) == 4:
+            break
+    return vals
+
+def write_branch_index(vault: Path, repo_path: Path, branch: str,
+                       scan: Optional[Dict[str, Optional[os.DirEntry]]] = None,
+                       max_entries: Optional[int] = None) -> Dict[str, str]:
     # Build index by scanning existing notes in the vault branch folder.
+    # Returns the sha found for each note file name so callers don't re-read notes.
     branch_dir = vault / "branches" / branch
     links: List[str] = []
     if not branch_dir.exists():
         branch_dir.mkdir(parents=True, exist_ok=True)
 
     # helper to extract sha, date, title and author from a note file
-    def extract_meta(note_path: Path) -> Optional[Tuple[datetime, str, str, str, str]]:
+    def extract_meta(name: str, entry: Optional[os.DirEntry] = None) -> Optional[Tuple[datetime, str, str, str, str]]:
+        # plain string paths: no Path object per note
+        note_path = entry.path if entry is not None else os.path.join(branch_dir_str, name)
+        # the rest of the note (diff bodies can be large) is only read when a
+        # body fallback below is needed
         try:
-            txt = note_path.read_text(encoding="utf-8")
+            vals, txt = read_note_meta(note_path)
         except Exception:
             return None
-        # extract frontmatter block if present
-        sha_val = None
-        date_val = None
-        title_val = None
-        author_val = None
-        if txt.startswith("---"):
-            try:
-                end = txt.find('\n---', 3)
-                if end != -1:
-                    fm = txt[3:end]
-                else:
-                    fm = txt
-            except Exception:
-                fm = txt
-            # find lines like: sha: "..." or sha: ...
-            for line in fm.splitlines():
-                if line.lstrip().lower().startswith('sha:'):
-                    _, v = line.split(':', 1)
-                    sha_val = v.strip().strip(' "\'')
-                if line.lstrip().lower().startswith('date:'):
-                    _, v = line.split(':', 1)
-                    date_val = v.strip().strip(' "\'')
-                if line.lstrip().lower().startswith('title:'):
-                    _, v = line.split(':', 1)
-                    title_val = v.strip().strip(' "\'')
-                if line.lstrip().lower().startswith('author:'):
-                    _, v = line.split(':', 1)
-                    author_val = v.strip().strip(' "\'')
+        sha_val = vals.get('sha')
+        date_val = vals.get('date')
+        title_val = vals.get('title')
+        author_val = vals.get('author')
         # fallback: search body for SHA: `...` and Date: ...
         if not sha_val:
-            import re
-            m = re.search(r"SHA:\s*`([0-9a-fA-F]{7,40})`", txt)
+            m = _RE_SHA.search(txt)
             if m:
                 sha_val = m.group(1)
         if not date_val:
-            import re
-            m = re.search(r"Date:\s*(.+)$", txt, re.MULTILINE)
+            m = _RE_DATE.search(txt)
             if m:
                 date_val = m.group(1).strip()
 
         # fallback: find first H1/H2 in body as title
         if not title_val:
-            import re
-            m = re.search(r"^#\s+(.+)$", txt, re.MULTILINE)
+            m = _RE_TITLE.search(txt)
             if m:
                 title_val = m.group(1).strip()
         if not author_val:
-            import re
-            m = re.search(r"Author:\s*(.+)$", txt, re.MULTILINE)
+            m = _RE_AUTHOR.search(txt)
             if m:
                 author_val = m.group(1).strip()
 
         # parse date_val to datetime if possible
-        dt = None
-        if date_val:
-            try:
-                from email.utils import parsedate_to_datetime
-
-                dt = parsedate_to_datetime(date_val)
-            except Exception:
-                try:
-                    dt = datetime.fromisoformat(date_val)
-                except Exception:
-                    dt = None
+        dt = parse_note_date(date_val) if date_val else None
         if not dt:
             # fallback to file mtime
             try:
-                dt = datetime.fromtimestamp(note_path.stat().st_mtime, timezone.utc)
+                st = entry.stat() if entry is not None else os.stat(note_path)
+                dt = datetime.fromtimestamp(st.st_mtime, timezone.utc)
             except Exception:
                 return None
 
         if not sha_val:
             # if no sha, use filename without extension as candidate
-            sha_val = note_path.stem
+            sha_val = name[:-3]
         if not title_val:
             # fallback to filename as title
-            title_val = note_path.stem
+            title_val = name[:-3]
         if not author_val:
             author_val = ""
         # sanitize returned filename
-        safe_name = sanitize_filename(note_path.name.strip())
+        safe_name = sanitize_filename(name.strip())
         return (dt, safe_name, title_val, author_val, sha_val)
 
-    metas: List[Tuple[datetime, str, str, str, str]] = []
-    for p in branch_dir.glob('*.md'):
-        if p.name == 'index.md':
-            continue
-        m = extract_meta(p)
+    if scan is None:
+        scan = scan_branch_dir(branch_dir)
+    # the scan gives the exact note count: fill a pre-sized list and trim the
+    # slots of unreadable notes
+    metas: List[Optional[Tuple[datetime, str, str, str, str]]] = [None] * len(scan)
+    known_shas: Dict[str, str] = {}
+    branch_dir_str = str(branch_dir)
+    n = 0
+    for name, entry in scan.items():
+        m = extract_meta(name, entry)
         if m:
-            metas.append(m)
-
-    # sort newest first
-    metas.sort(key=lambda t: t[0], reverse=True)
+            metas[n] = m
+            known_shas[name] = m[4]
+            n += 1
+    del metas[n:]
+
+    # newest first; with a cap only the newest max_entries need ordering
+    if max_entries:
+        metas = heapq.nlargest(max_entries, metas, key=itemgetter(0))
+    else:
+        metas.sort(key=itemgetter(0), reverse=True)
+    head_note = ''
     for dt, name, title, author, sha in metas:
         # sanitize filename to avoid embedded newlines or whitespace
-        safe_name = name.replace('\n', '').replace('\r', '').strip()
-        # sanitize title for wiki-alias (remove pipeline and closing brackets)
-        safe_title = title.replace(']]', '').replace('|', '¦')
+        safe_name = name.translate(_NAME_NL_TABLE).strip()
+        # sanitize title for wiki-alias (remove closing brackets, escape pipes),
         # collapse whitespace and remove newlines
-        import re as _re
-        safe_title = _re.sub(r"\s+", " ", safe_title).strip()
-        # human-friendly date
+        safe_title = _RE_WS.sub(" ", title.replace(']]', '').translate(_TITLE_TABLE)).strip()
+        # human-friendly date, with no stray newlines
         try:
-            date_str = dt.strftime('%Y-%m-%d %H:%M %z')
+            date_str = dt.strftime('%Y-%m-%d %H:%M %z').translate(_DATE_NL_TABLE)
         except Exception:
             date_str = ''
-        # ensure no stray newlines
-        date_str = date_str.replace('\n', ' ').replace('\r', ' ')
         # Build a compact bullet entry with alias, date, author and short sha
         short_sha = (sha[:7] if sha else safe_name[:7])
-        safe_author = (author or '').replace('\n', ' ').replace('\r', '').strip()
+        safe_author = (author or '').translate(_AUTHOR_NL_TABLE).strip()
         # Use wiki-link without extension and without './' so Obsidian resolves locally
-        if safe_name.lower().endswith('.md'):
-            link_target = safe_name[:-3]
-        else:
-            link_target = safe_name
-        entry = f"- [[{link_target}|{safe_title}]] — {date_str}"
-        if safe_author:
-            entry += f" — {safe_author}"
-        entry += f" — {short_sha}"
-        links.append(entry)
-
-    head_note = ''
-    if metas:
-        # Head note should be the first note name without extension (wiki-link target)
-        first_name = metas[0][1].replace('\n', '').replace('\r', '').strip()
-        head_note = first_name[:-3] if first_name.lower().endswith('.md') else first_name
-
-    tmpl = load_template_from_vault(vault, "branch-index") or DEFAULT_BRANCH_TEMPLATE
+        link_target = _strip_md(safe_name)
+        if not links:
+            # Head note is the newest note's wiki-link target
+            head_note = link_target
+        links.append(f"- [[{link_target}|{safe_title}]] — {date_str}"
+                     f"{' — ' + safe_author if safe_author else ''} — {short_sha}")
+
+    tmpl = resolve_template(vault, "branch-index", DEFAULT_BRANCH_TEMPLATE)
+    # one timestamp for both fields
+    now_iso = datetime.now(timezone.utc).isoformat()
     content = render_template(tmpl, {
         "branch": branch,
-        "branch_yaml": json.dumps(branch),
-        "updated": datetime.now(timezone.utc).isoformat(),
-        "updated_yaml": json.dumps(datetime.now(timezone.utc).isoformat()),
+        "branch_yaml": yaml_scalar(branch),
+        "updated": now_iso,
+        "updated_yaml": yaml_scalar(now_iso),
         "commit_links": "\n".join(links) if links else "(no commits)",
         "head_note": head_note,
     })
     idx_path = branch_dir / "index.md"
     atomic_write(idx_path, content)
+    return known_shas
 
 # ---------------------------------------------------------------------------
 # CLI Commands
@@ -879,20 +1373,37 @@ def cmd_sync(cfg: AppConfig, args: argparse.Namespace) -> int:
     if not repo:
         eprint(f"Repo id '{rid}' not found")
         return 1
-    return perform_sync(repo, cfg)
+    return perform_sync(repo, cfg, args.num_processes, batch_durable=args.batch_durable)
 
 def cmd_sync_all(cfg: AppConfig, args: argparse.Namespace) -> int:
     if not cfg.repos:
         print("No repositories configured.")
         return 0
-    any_fail = False
-    for r in cfg.repos:
-        rc = perform_sync(r, cfg)
-        if rc != 0:
-            any_fail = True
-    return 1 if any_fail else 0
+    # repos are independent: sync them concurrently, then write the config once.
+    # They share one set of note-writing pools so workers don't multiply per repo.
+    with sync_pools(args.num_processes) as pools, \
+            ThreadPoolExecutor(max_workers=min(_MAX_PARALLEL_SYNCS, len(cfg.repos))) as ex:
+        futures = [ex.submit(perform_sync, r, cfg, args.num_processes, False, args.batch_durable, pools)
+                   for r in cfg.repos]
+    save_config(cfg)
+    return 1 if any(f.result() != 0 for f in futures) else 0
+
+@contextlib.contextmanager
+def sync_pools(num_workers: Optional[int] = None) -> Iterator[Tuple[ThreadPoolExecutor, ProcessPoolExecutor]]:
+    """Open the thread and process pools that write commit notes.
 
-def perform_sync(repo: RepoConfig, cfg: AppConfig) -> int:
+    Processes are only started once a batch is large enough to use them. They
+    come from a fresh forkserver/spawn process, not forked from this threaded
+    one, so they hold no copies of other branches' git pipes.
+    """
+    workers = num_workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=_process_context()) as procs:
+        yield pool, procs
+
+def perform_sync(repo: RepoConfig, cfg: AppConfig, num_workers: Optional[int] = None, save: bool = True,
+                 batch_durable: bool = False,
+                 pools: Optional[Tuple[ThreadPoolExecutor, ProcessPoolExecutor]] = None) -> int:
     repo_path = Path(repo.repoPath)
     vault = Path(repo.vaultPath)
     if not ensure_git_repo(repo_path):
@@ -900,82 +1411,266 @@ def perform_sync(repo: RepoConfig, cfg: AppConfig) -> int:
         return 1
     vault.mkdir(parents=True, exist_ok=True)
 
-    # Determine branches
+    # Determine branches; branch heads come from the same for-each-ref call
+    local = list_local_branches(repo_path)
+    heads = {name: head for name, head, _ in local}
     if repo.branches:
         branches = repo.branches
     else:
-        branches = list_local_branches(repo_path)
+        branches = [name for name, _, _ in local]
     if not branches:
         print(f"[sync] No branches found for {repo.name}")
         return 0
 
-    processed_total = 0
-    for br in branches:
-        print(f"[sync] Branch {br}")
-        last = repo.lastSync.get(br)
-        if isinstance(last, str):  # sanitize stored sha
-            last = last.strip() or None
-        limit = repo.options.maxInitialCommitsPerBranch if not last else None
-        commits = list(iter_commits(repo_path, br, last, repo.options.includeMerges, limit))
-        if not commits:
-            print("  up to date")
-            write_branch_index(vault, repo_path, br)
-            continue
-        for c in commits:
-            # Determine target note path early
-            fname = compute_filename(repo.options.fileNameStyle, c["sha"], c.get("date", ""), c.get("subject", ""))
-            fname = sanitize_filename(fname)
-            if not fname.lower().endswith('.md'):
-                fname = fname + '.md'
-            note_path = vault / "branches" / br / fname
-            if note_path.exists():
-                # Existing note: ensure diff sections present if requested
-                ensure_diff_sections(note_path, repo_path, c["sha"], repo.options.includeDiffStat, repo.options.includeDiff, repo.options.skipBinaryDiff)
-                continue
-            # New note: fetch diffs if requested
-            c["diffstat"] = get_diffstat(repo_path, c["sha"]) if repo.options.includeDiffStat else ""
-            c["diff"] = get_diff(repo_path, c["sha"], skip_binary=repo.options.skipBinaryDiff) if repo.options.includeDiff else ""
-            write_commit_note(vault, br, c, repo.options, repo.id)
-            processed_total += 1
-        # update lastSync for this branch to newest commit processed
-        repo.lastSync[br] = commits[-1]["sha"]
-        write_branch_index(vault, repo_path, br)
-        
-        # After processing new commits, ensure all existing notes have diff sections if requested
-        if repo.options.includeDiffStat or repo.options.includeDiff:
-            branch_dir = vault / "branches" / br
-            if branch_dir.exists():
-                for note_file in branch_dir.glob("*.md"):
-                    if note_file.name == "index.md":
-                        continue
-                    # Extract SHA from frontmatter or filename
-                    try:
-                        txt = note_file.read_text(encoding="utf-8")
-                        sha = None
-                        if txt.startswith("---"):
-                            end = txt.find('\n---', 3)
-                            fm = txt[3:end] if end != -1 else txt
-                            for line in fm.splitlines():
-                                if line.lstrip().lower().startswith('sha:'):
-                                    _, v = line.split(':', 1)
-                                    sha = v.strip().strip(' "\'')
-                                    break
-                        if not sha:
-                            sha = note_file.stem
-                        if sha:
-                            ensure_diff_sections(note_file, repo_path, sha, repo.options.includeDiffStat, repo.options.includeDiff, repo.options.skipBinaryDiff)
-                    except Exception:
-                        continue
+    # Notes are independent files, so writing them is fanned out to pools
+    # shared by all branches (and, in sync-all, all repos); git output is
+    # already streamed, leaving mostly rendering and file I/O.
+    with contextlib.ExitStack() as stack:
+        if pools is None:
+            pools = stack.enter_context(sync_pools(num_workers))
+        pool, procs = pools
+        cat = stack.enter_context(GitCatFile(repo_path))
+        processed_total = _sync_branches(repo, repo_path, vault, branches, heads, pool, procs, cat, batch_durable)
+    prune_complete_state(vault, repo.id, heads)
 
     repo.updatedAt = datetime.now(timezone.utc).isoformat()
-    save_config(cfg)
+    if save:
+        save_config(cfg)
     print(f"[sync] Done: {processed_total} new commits written for '{repo.name}'.")
     return 0
 
+def _sync_branches(repo: RepoConfig, repo_path: Path, vault: Path, branches: List[str], heads: Dict[str, str],
+                   pool: ThreadPoolExecutor, procs: ProcessPoolExecutor, cat: GitCatFile,
+                   durable: bool = False) -> int:
+    # Branches are synced concurrently: their work is mostly git subprocesses
+    # and file I/O, and each only touches its own folder and state file.
+    lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=min(_MAX_PARALLEL_SYNCS, len(branches))) as branch_pool:
+        futures = [branch_pool.submit(_process_branch, repo, repo_path, vault, br, heads, pool, procs, cat, lock,
+                                      durable)
+                   for br in branches]
+    return sum(f.result() for f in futures)
+
+def _process_branch(repo: RepoConfig, repo_path: Path, vault: Path, br: str, heads: Dict[str, str],
+                    pool: ThreadPoolExecutor, procs: ProcessPoolExecutor, cat: GitCatFile, lock: threading.Lock,
+                    durable: bool = False) -> int:
+    """Sync one branch and return the number of notes written; lastSync is updated under lock."""
+    print(f"[sync] Branch {br}")
+    with lock:
+        last = repo.lastSync.get(br)
+    if isinstance(last, str):  # sanitize stored sha
+        last = last.strip() or None
+    branch_dir = vault / "branches" / br
+    # one directory listing per branch, reused for existence checks,
+    # parent links, the branch index and the diff backfill
+    stale: List[str] = []
+    scan = scan_branch_dir(branch_dir, stale)
+    for path in stale:
+        # left by an interrupted durable batch; its notes may be partly
+        # written and weren't recorded in lastSync, so they are written again.
+        # Folders of live syncs (repos sharing this vault) are left alone.
+        if staging_is_stale(path):
+            shutil.rmtree(path, ignore_errors=True)
+    # shas whose notes already carry the requested diff sections; a state
+    # file written under other diff options starts the branch over
+    key = diff_options_key(repo.options)
+    state_path = complete_state_dir(vault, repo.id) / f"{br}.json"
+    complete = load_complete_shas(state_path, key)
+    loaded = len(complete)
+    try:
+        return _sync_branch_notes(repo, repo_path, vault, br, heads, pool, procs, cat, lock, durable,
+                                  last, scan, complete)
+    finally:
+        # entries are only added once their note is done, so a failed sync keeps them too
+        if len(complete) != loaded:
+            save_complete_shas(state_path, key, complete)
+
+def _sync_branch_notes(repo: RepoConfig, repo_path: Path, vault: Path, br: str, heads: Dict[str, str],
+                       pool: ThreadPoolExecutor, procs: ProcessPoolExecutor, cat: GitCatFile,
+                       lock: threading.Lock, durable: bool, last: Optional[str],
+                       scan: Dict[str, Optional[os.DirEntry]], complete: Set[str]) -> int:
+    """Write branch br's new notes, its index and missing diff sections, recording finished shas in complete."""
+    processed = 0
+    branch_dir = vault / "branches" / br
+    if last and heads.get(br) == last:
+        # branch head unchanged since last sync: no git log needed
+        print(f"  {br}: up to date")
+        known_shas = write_branch_index(vault, repo_path, br, scan, repo.options.maxBranchIndexEntries)
+        _backfill_diff_sections(repo, repo_path, vault, br, cat, scan, known_shas, complete)
+        return 0
+    limit = repo.options.maxInitialCommitsPerBranch if not last else None
+    # commits (and their diffs) are consumed as git log streams them,
+    # oldest first; only a bounded batch of new notes is held at a time
+    commits = iter_commits(repo_path, br, last, repo.options.includeMerges, limit,
+                           repo.options.includeDiffStat, repo.options.includeDiff,
+                           repo.options.skipBinaryDiff, cat)
+    parent_index = build_parent_index(branch_dir, scan)
+    new_notes: List[Dict[str, Any]] = []
+    written: set = set()
+    newest: Optional[str] = None
+    for c in commits:
+        newest = c["sha"]
+        # Determine target note path early
+        note_path = commit_note_path(vault, br, c, repo.options.fileNameStyle)
+        if note_path.name in written:
+            # filename collision within this run (e.g. short-sha style)
+            continue
+        if note_path.name in scan:
+            # Existing note: ensure diff sections present if requested, using the
+            # diffstat/diff the git log stream already carried for this commit
+            if c["sha"] not in complete and ensure_diff_sections(
+                    note_path, repo_path, c["sha"], repo.options.includeDiffStat, repo.options.includeDiff,
+                    repo.options.skipBinaryDiff, (c.get("diffstat", ""), c.get("diff", ""))):
+                complete.add(c["sha"])
+            continue
+        written.add(note_path.name)
+        scan[note_path.name] = None
+        # New note: diffstat/diff were captured by the git log stream.
+        # Register its stem before any note is rendered so children
+        # written concurrently still resolve the link to it.
+        index_note_stem(parent_index, note_path.stem)
+        new_notes.append(c)
+        if len(new_notes) >= _NOTE_BATCH_SIZE:
+            _write_new_notes(vault, br, new_notes, repo, parent_index, pool, procs, durable)
+            complete.update(n["sha"] for n in new_notes)
+            processed += len(new_notes)
+            new_notes = []
+    _write_new_notes(vault, br, new_notes, repo, parent_index, pool, procs, durable)
+    complete.update(n["sha"] for n in new_notes)
+    processed += len(new_notes)
+    if newest is None:
+        print(f"  {br}: up to date")
+        write_branch_index(vault, repo_path, br, scan, repo.options.maxBranchIndexEntries)
+        return processed
+    # update lastSync for this branch to newest commit processed
+    with lock:
+        repo.lastSync[br] = newest
+    known_shas = write_branch_index(vault, repo_path, br, scan, repo.options.maxBranchIndexEntries)
+    
+    # After processing new commits, ensure all existing notes have diff sections if requested
+    _backfill_diff_sections(repo, repo_path, vault, br, cat, scan, known_shas, complete)
+    return processed
+
+def _backfill_diff_sections(repo: RepoConfig, repo_path: Path, vault: Path, br: str, cat: GitCatFile,
+                            scan: Dict[str, Optional[os.DirEntry]], known_shas: Dict[str, str],
+                            complete: Set[str]) -> None:
+    """Ensure all existing notes of branch br have diff sections if requested.
+
+    Notes whose sha is in complete were already handled under the current diff
+    options and are skipped; newly handled ones are added to it.
+    """
+    if not (repo.options.includeDiffStat or repo.options.includeDiff):
+        return
+    branch_dir = vault / "branches" / br
+    min_bytes = repo.options.minCompleteBytes
+    # notes still to check, by full commit sha, so their diffs can come from
+    # one diff-tree process instead of a git show per note
+    pending: Dict[str, List[Tuple[str, str]]] = {}
+    for name, entry in scan.items():
+        # sha parsed by write_branch_index; notes it couldn't read fall back to the filename
+        try:
+            sha = known_shas.get(name) or name[:-3]
+            if not sha or sha in complete:
+                continue
+            if min_bytes is not None and entry is not None and entry.stat().st_size >= min_bytes:
+                # large enough to already carry its diffs: skip reading it. Not
+                # recorded as complete, so a lowered threshold re-checks it.
+                continue
+            # stems of non-sha filename styles aren't commits: nothing to diff
+            obj = cat.lookup(sha)
+            if obj is not None and obj[1] == "commit":
+                pending.setdefault(obj[0], []).append((name, sha))
+        except Exception:
+            continue
+    if not pending:
+        return
+    try:
+        for sha, ds, df in iter_commit_diffs(repo_path, list(pending), repo.options.includeDiffStat,
+                                             repo.options.includeDiff, repo.options.skipBinaryDiff):
+            # key: the sha as the note gives it, possibly abbreviated
+            for name, key in pending.get(sha, ()):
+                if ensure_diff_sections(branch_dir / name, repo_path, sha, repo.options.includeDiffStat,
+                                        repo.options.includeDiff, repo.options.skipBinaryDiff, (ds, df)):
+                    complete.add(key)
+    except subprocess.CalledProcessError:
+        pass  # notes left unchecked are retried on the next sync
+
+# branches (and repos in sync-all) synced at the same time
+_MAX_PARALLEL_SYNCS = 8
+
+# Spawning processes only pays off for first syncs with many notes to render;
+# incremental syncs stay on the thread pool.
+_PROCESS_POOL_THRESHOLD = 64
+_PROCESS_POOL_CHUNKSIZE = 32
+# new notes (diffs included) held in memory before they are written out
+_NOTE_BATCH_SIZE = 1024
+
+def _process_context() -> Any:
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _write_commit_worker(args: Tuple[Any, ...]) -> None:
+    # (vault, branch, commit, options, repo_id, parent_links, stage_dir)
+    write_commit_note(*args)
+
+def _resolved_parents(index: Dict[str, str], parents: List[str]) -> Dict[str, str]:
+    """The entries of index that parents_links needs for parents, keyed by full sha.
+
+    Sent to worker processes instead of the whole branch index, which grows
+    with every note written.
+    """
+    resolved: Dict[str, str] = {}
+    for p in parents:
+        target = (index.get(p) or index.get(p[:7])) if p else None
+        if target:
+            resolved[p] = target
+    return resolved
+
+def _write_new_notes(vault: Path, br: str, commits: List[Dict[str, Any]], repo: RepoConfig,
+                     parent_index: Dict[str, str], pool: ThreadPoolExecutor, procs: ProcessPoolExecutor,
+                     durable: bool = False) -> None:
+    if not commits:
+        return
+    stage_dir = None
+    if durable:
+        # staged under the branch folder so the final renames stay on one
+        # filesystem, in a folder of its own: other repos syncing into this
+        # vault may be publishing a batch for a branch of the same name
+        branch_dir = vault / "branches" / br
+        branch_dir.mkdir(parents=True, exist_ok=True)
+        stage_dir = Path(tempfile.mkdtemp(prefix=f"{STAGING_PREFIX}{os.getpid()}-", dir=branch_dir))
+    try:
+        if len(commits) > _PROCESS_POOL_THRESHOLD:
+            tasks = [(vault, br, c, repo.options, repo.id, _resolved_parents(parent_index, c.get("parents", [])),
+                      stage_dir) for c in commits]
+            for _ in procs.map(_write_commit_worker, tasks, chunksize=_PROCESS_POOL_CHUNKSIZE):
+                pass
+        else:
+            pending = [pool.submit(write_commit_note, vault, br, c, repo.options, repo.id, parent_index, stage_dir)
+                       for c in commits]
+            _raise_failures(wait(pending).done)
+    finally:
+        if stage_dir is not None:
+            # notes written before a failure are still published
+            publish_staged(stage_dir, stage_dir.parent)
+
+def _raise_failures(done: Iterable[Future]) -> None:
+    for f in done:
+        f.result()
+
 # ---------------------------------------------------------------------------
 # Argument parser
 # ---------------------------------------------------------------------------
 
+def _positive_int(value: str) -> int:
+    try:
+        n = int(value)
+    except ValueError:
+        n = 0
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return n
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         prog="gitsidian",
@@ -1004,9 +1699,17 @@ def build_parser() -> argparse.ArgumentParser:
     #   gitsidian sync --id formo
     p_sync.add_argument("--id", required=False, help="Repository id to sync")
     p_sync.add_argument("repo", nargs="?", help="Repository id (positional, optional)")
+    p_sync.add_argument("--num-processes", type=_positive_int, default=None,
+                        help="Parallel workers writing commit notes (default: CPU count)")
+    p_sync.add_argument("--batch-durable", action="store_true",
+                        help="Flush new commit notes to disk once per batch (staged, then renamed into place)")
     p_sync.set_defaults(func=cmd_sync)
 
     p_sync_all = sub.add_parser("sync-all", help="Sync all repositories")
+    p_sync_all.add_argument("--num-processes", type=_positive_int, default=None,
+                            help="Parallel workers writing commit notes (default: CPU count)")
+    p_sync_all.add_argument("--batch-durable", action="store_true",
+                            help="Flush new commit notes to disk once per batch (staged, then renamed into place)")
     p_sync_all.set_defaults(func=cmd_sync_all)
 
     p_doctor = sub.add_parser("doctor", help="Run environment checks")